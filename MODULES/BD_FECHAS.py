@@ -0,0 +1,49 @@
+"""
+Fechas del BD parseadas una sola vez y compartidas entre el precosteo y el resumen.
+
+prepare_dates() agrega una columna derivada (ej: FECHA -> __FECHA_DT__) y la
+registra en bd.attrs; day_series() la reutiliza si existe y si no, parsea.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+import pandas as pd
+
+# bd.attrs[_PREPARED_ATTR] = {columna_origen: columna_parseada}
+_PREPARED_ATTR = "dates_prepared"
+
+
+def dt_column(col: str) -> str:
+    """Nombre de la columna parseada para 'col' (ej: FECHA -> __FECHA_DT__)."""
+    return f"__{col}_DT__"
+
+
+def parse_day(s: pd.Series) -> pd.Series:
+    """pd.to_datetime vectorizado y truncado al día (sin hora); inválidos -> NaT."""
+    fechas = pd.to_datetime(s, errors="coerce")
+    if fechas.dt.tz is not None:
+        fechas = fechas.dt.tz_localize(None)
+    return fechas.dt.normalize()
+
+
+def prepare_dates(bd: pd.DataFrame, cols: Iterable[str]) -> pd.DataFrame:
+    """
+    Parsea (una sola vez) las columnas fecha indicadas que existan en el BD.
+    Modifica el BD en sitio y lo devuelve para encadenar.
+    """
+    prepared = dict(bd.attrs.get(_PREPARED_ATTR) or {})
+    for col in cols:
+        if col in bd.columns and col not in prepared:
+            bd[dt_column(col)] = parse_day(bd[col])
+            prepared[col] = dt_column(col)
+    bd.attrs[_PREPARED_ATTR] = prepared
+    return bd
+
+
+def day_series(bd: pd.DataFrame, col: str) -> pd.Series:
+    """Fechas (solo día) de 'col': la columna ya preparada si existe; si no, se parsea."""
+    dt_col = (bd.attrs.get(_PREPARED_ATTR) or {}).get(col)
+    if dt_col is not None and dt_col in bd.columns:
+        return bd[dt_col]
+    return parse_day(bd[col])
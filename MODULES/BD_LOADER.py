@@ -0,0 +1,63 @@
+"""
+Carga del BD desde Excel con un espejo binario junto al .xlsx.
+
+pd.read_excel (XML de openpyxl) es el paso más lento de cada corrida: la primera
+lectura guarda la hoja como pickle (ej: BD_X.BD.pkl) y las siguientes lo leen
+directo mientras el Excel no sea más reciente.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+
+def mirror_path(xlsx_path: str | Path, sheet: str = "BD") -> Path:
+    """Ruta del espejo de una hoja: <carpeta>/<nombre>.<hoja>.pkl"""
+    xlsx_path = Path(xlsx_path)
+    return xlsx_path.with_name(f"{xlsx_path.stem}.{sheet}.pkl")
+
+
+def _read_sheet(xlsx_path: Path, sheet: str) -> pd.DataFrame:
+    """
+    read_excel con calamine (lector en Rust, mucho más rápido); si no está instalado,
+    el motor que pandas elige por extensión (.xlsx, .xls, .ods).
+    """
+    try:
+        return pd.read_excel(xlsx_path, sheet_name=sheet, engine="calamine")
+    except ImportError:
+        return pd.read_excel(xlsx_path, sheet_name=sheet)
+
+
+def load_bd(xlsx_path: str | Path, sheet: str = "BD") -> pd.DataFrame:
+    """
+    Lee la hoja 'sheet' del Excel, usando el espejo si está al día (mtime >= Excel).
+    Si el Excel cambió, no hay espejo o no se puede leer, lo lee y regenera el espejo.
+    El espejo es un pickle (leerlo puede ejecutar código): la carpeta debe ser de confianza.
+    """
+    xlsx_path = Path(xlsx_path)
+    espejo = mirror_path(xlsx_path, sheet)
+
+    if espejo.exists() and espejo.stat().st_mtime >= xlsx_path.stat().st_mtime:
+        try:
+            return pd.read_pickle(espejo)
+        except Exception:
+            pass  # espejo ilegible (otra versión de pandas, corrupto): se regenera desde el Excel
+
+    bd = _read_sheet(xlsx_path, sheet)
+
+    # Escritura atómica: un espejo a medio escribir nunca queda con mtime "al día"
+    tmp = espejo.with_suffix(".tmp")
+    bd.to_pickle(tmp)
+    tmp.replace(espejo)
+    return bd
+
+
+def build_df_lugares(bd: pd.DataFrame, col: str = "ZONA") -> pd.DataFrame:
+    """
+    df_lugares para el precosteo: valores únicos de 'col' (sin nulos, recortados),
+    en orden de aparición. Se recortan solo los valores distintos (pd.unique en C)
+    en vez de cada fila del BD.
+    """
+    zonas = pd.unique(bd[col].dropna())
+    return pd.DataFrame({col: list(dict.fromkeys(str(z).strip() for z in zonas))}, dtype=object)
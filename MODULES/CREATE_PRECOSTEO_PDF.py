@@ -1,53 +1,146 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import os
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from functools import lru_cache
+from io import BytesIO
+from itertools import accumulate, repeat
 from pathlib import Path
 from datetime import datetime, date
-from typing import Optional, Tuple
+from typing import NamedTuple, Optional, Tuple
 
 from fpdf import FPDF
+from fpdf.enums import Align, XPos, YPos
+from fpdf.image_parsing import preload_image
+from fpdf.line_break import MultiLineBreak, TextLine
+from PIL import Image
 import pandas as pd
 
+# Config y spec viven en un módulo liviano (sin fpdf/pandas); se re-exportan aquí
+from MODULES.PRECOSTEO_CONFIG import PDFLayoutConfig, PrecosteoSpec, _DEFAULT_CONFIG
+from MODULES.BD_FECHAS import day_series, prepare_dates
 
 
-@dataclass(frozen=True)
-class PDFLayoutConfig:
-    # Página
-    orientation: str = "P"
-    unit: str = "mm"
-    format: str = "Letter"
+# Índice = número de mes (posición 0 sin uso)
+_MESES = (
+    "", "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+)
 
-    # Márgenes (mm)
-    top_margin: float = 24.0
-    left_margin: float = 15.0
-    right_margin: float = 15.0
 
-    # Espacios visuales (mm)
-    header_lift_after: float = 12.0
+# Formatos de fecha de _to_date, agrupados por separador (mismo orden de prioridad)
+_DATE_FORMATS_DASH = ("%Y-%m-%d", "%d-%m-%Y")
+_DATE_FORMATS_SLASH = ("%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d")
+_NUM_DATE_RE = re.compile(r"[./-]*(\d+)[./-]+(\d+)[./-]+(\d{4})[./-]*")
 
-    # Plantillas
-    templates_dirname: str = "TEMPLATES"
-    header_filename: str = "header.png"
-    footer_filename: str = "footer.png"
 
-    signature_filename: str = "firma.png"
-    signature_width_ratio: float = 0.60   # ajusta (0.55–0.70 suele quedar bien)
-    signature_gap_before: float = 10.0     # espacio (mm) después de la tabla
+# ─────────────── Detección de columnas ───────────────
+# Candidatos por clave, en orden de prioridad
+_TABLE_COLUMNS = {
+    "item": ("ID_ITEM", "ID ÍTEM", "ITEM", "ÍTEM", "COD_ITEM"),
+    "descripcion": ("ACTIVIDAD", "DESCRIPCION", "DESCRIPCIÓN", "DESCRIPCION_ACTIVIDAD"),
+    "unidad": ("UNIDAD_MEDIDA", "UNIDAD", "UND"),
+    "cantidad": ("CANTIDAD", "CANT"),
+    "v_unit": ("VALOR_UNITARIO", "VR_UNITARIO", "VLR_UNITARIO", "PRECIO_UNITARIO"),
+    "v_total": ("VALOR_TOTAL", "VR_TOTAL", "VLR_TOTAL", "TOTAL"),
+}
+_DATE_COLUMNS = {
+    "fecha": ("FECHA", "FECHA_ACTIVIDAD", "FECHA_EJECUCION", "FECHA EJECUCION", "DATE"),
+    "inicio": ("FECHA_INICIO", "INICIO", "FECHA INICIO", "START", "DESDE"),
+    "fin": ("FECHA_FIN", "FIN", "FECHA FIN", "END", "HASTA"),
+}
 
-    # Salida
-    output_dirname: str = "BD/PRECOSTEOS"
-    output_prefix: str = "PRECOSTEO"
 
-    # Tipografía por defecto
-    default_font_family: str = "Helvetica"
-    default_font_size: int = 12
-    default_line_height: float = 6.0
+def _column_ranks(candidates: dict) -> dict:
+    """NOMBRE_EN_MAYÚSCULAS -> (clave, prioridad)."""
+    return {
+        name.upper(): (key, prio)
+        for key, names in candidates.items()
+        for prio, name in enumerate(names)
+    }
 
-    # Footer (ajuste fino visual)
-    footer_height: float = 12.0
-    footer_width_ratio: float = 0.50
-    footer_bottom_margin: float = 7.0
-    footer_margin: float = 28.0  # margen de seguridad para el contenido
+
+_TABLE_RANKS = _column_ranks(_TABLE_COLUMNS)
+_DATE_RANKS = _column_ranks(_DATE_COLUMNS)
+
+
+def _pick_columns(cols: tuple, ranks: dict) -> dict:
+    """
+    Una sola pasada sobre las columnas (lookup O(1) por nombre): por cada clave
+    gana el candidato de mayor prioridad. Devuelve nombres ya sin espacios.
+    """
+    best = {}
+    for c in cols:
+        c = str(c).strip()
+        hit = ranks.get(c.upper())
+        if hit is None:
+            continue
+        key, prio = hit
+        if key not in best or prio <= best[key][0]:
+            best[key] = (prio, c)
+    return {key: c for key, (_, c) in best.items()}
+
+
+# Memoizadas por tupla de columnas: en lotes el mismo BD se resuelve una sola vez
+@lru_cache(maxsize=32)
+def _table_colmap(cols: tuple) -> dict:
+    return _pick_columns(cols, _TABLE_RANKS)
+
+
+@lru_cache(maxsize=32)
+def _date_colmap(cols: tuple) -> dict:
+    return _pick_columns(cols, _DATE_RANKS)
+
+
+# Columnas candidatas para "lugar de ejecución", en orden de prioridad (ya en mayúsculas)
+_PREFERIDAS_LUGAR = tuple(p.upper() for p in (
+    "LUGAR_EJECUCION", "LUGAR", "LUGAR DE EJECUCIÓN", "LUGAR DE EJECUCION",
+    "UBICACION", "UBICACIÓN", "DESCRIPCION_LUGAR", "DESCRIPCIÓN", "DESCRIPCION",
+))
+
+
+# ─────────────── Rutas (resueltas una sola vez por proceso) ───────────────
+@lru_cache(maxsize=1)
+def _resolve_project_root() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+@lru_cache(maxsize=None)
+def _validated_template(path: Path, label: str) -> Path:
+    """Verifica (una sola vez) que la plantilla exista; si no, lanza FileNotFoundError."""
+    if not path.exists():
+        raise FileNotFoundError(f"No se encontró {label}: {path}")
+    return path
+
+
+@lru_cache(maxsize=None)
+def _template_bytes(path: Path) -> bytes:
+    """Bytes de la plantilla, leídos del disco una sola vez y compartidos entre PDFs."""
+    return path.read_bytes()
+
+
+class _TemplateSet(NamedTuple):
+    """Rutas ya resueltas y plantillas preparadas, compartidas por todos los PDFs del proceso."""
+    templates_dir: Path
+    output_dir: Path
+    header: Path
+    footer: Path
+    signature: Path
+
+
+# Formato COP: intercambia separadores de miles/decimales ("," <-> ".")
+_COP_TABLE = str.maketrans({",": ".", ".": ","})
+_COP_PREFIX = "$  "
+
+# Caracteres no válidos en nombres de archivo -> "_" (una sola pasada con translate)
+_SAFE_FILENAME = str.maketrans({" ": "_", "/": "_", "\\": "_", ":": "_"})
+
+# Directorios de salida ya creados en este proceso (evita mkdir en cada save)
+_ensured_dirs: set[Path] = set()
 
 
 class CreatePrecostoPDF(FPDF):
@@ -59,29 +152,22 @@ class CreatePrecostoPDF(FPDF):
     """
 
     def __init__(self, config: PDFLayoutConfig | None = None):
-        self.config = config or PDFLayoutConfig()
+        self.config = config or _DEFAULT_CONFIG
 
         super().__init__(
             orientation=self.config.orientation,
             unit=self.config.unit,
             format=self.config.format,
         )
+        self.set_image_filter(self.config.image_filter)
 
-        self._project_root = self._resolve_project_root()
-        self._templates_dir = self._project_root / self.config.templates_dirname
-        self._output_dir = self._project_root / self.config.output_dirname
-
-        self.header_img = self._templates_dir / self.config.header_filename
-        self.footer_img = self._templates_dir / self.config.footer_filename
-
-        self.signature_img = self._templates_dir / self.config.signature_filename
-        if not self.signature_img.exists():
-            raise FileNotFoundError(f"No se encontró firma: {self.signature_img}")
-
-        if not self.header_img.exists():
-            raise FileNotFoundError(f"No se encontró header: {self.header_img}")
-        if not self.footer_img.exists():
-            raise FileNotFoundError(f"No se encontró footer: {self.footer_img}")
+        # Rutas resueltas y plantillas ya preparadas: un solo acierto de caché por PDF
+        tpl = self._templates(self.config, self.w)
+        self._templates_dir = tpl.templates_dir
+        self._output_dir = tpl.output_dir
+        self.header_img = tpl.header
+        self.footer_img = tpl.footer
+        self.signature_img = tpl.signature
 
         # Layout
         self.set_margins(
@@ -91,16 +177,86 @@ class CreatePrecostoPDF(FPDF):
         )
         self.set_auto_page_break(auto=True, margin=self.config.footer_margin)
 
-        self._bd = None  # se guarda por si luego lo usas en otras secciones
+        # Header/footer se registran una sola vez; cada página solo referencia el XObject
+        self._header_key = self._preload_template(self.header_img)
+        self._footer_key = self._preload_template(self.footer_img)
 
-    @staticmethod
-    def _resolve_project_root() -> Path:
-        return Path(__file__).resolve().parents[1]
+        # Un solo timestamp por documento: fecha del cuerpo y del nombre de archivo coinciden
+        self._now = datetime.now()
+        self._date_str = self._now.strftime("%Y-%m-%d")
+        self._fecha_str = self._fecha_es(self._now.date())
+
+        self._cur_font = None  # (tamaño, negrita) vigente según set_default_typography
+
+    @classmethod
+    @lru_cache(maxsize=8)
+    def _templates(cls, config: PDFLayoutConfig, page_w: float) -> _TemplateSet:
+        """
+        Resuelve carpetas, valida las plantillas y prepara sus copias JPEG una
+        sola vez por (config, ancho de página); el resto del lote reutiliza el resultado.
+        """
+        root = _resolve_project_root()
+        templates_dir = root / config.templates_dirname
+
+        header = _validated_template(templates_dir / config.header_filename, "header")
+        footer = _validated_template(templates_dir / config.footer_filename, "footer")
+        signature = _validated_template(templates_dir / config.signature_filename, "firma")
+
+        # Copias JPEG reducidas al ancho real en página (cacheadas en disco junto al original).
+        # Firma: también como JPEG ya reducido, así fpdf2 la embebe sin decodificar/re-comprimir
+        dpi, quality = config.template_dpi, config.template_jpeg_quality
+        usable_w = page_w - config.left_margin - config.right_margin
+        return _TemplateSet(
+            templates_dir=templates_dir,
+            output_dir=root / config.output_dirname,
+            header=cls._prepare_template(header, page_w, dpi, quality),
+            footer=cls._prepare_template(footer, page_w * config.footer_width_ratio, dpi, quality),
+            signature=cls._prepare_template(
+                signature, usable_w * config.signature_width_ratio, dpi, quality
+            ),
+        )
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _prepare_template(
+        cls,
+        path: Path,
+        target_width_mm: float,
+        dpi: int = 150,
+        quality: int = 85,
+    ) -> Path:
+        """
+        Devuelve una versión JPEG de la plantilla reducida a 'dpi' para el ancho
+        con el que se dibuja. Se genera una sola vez y se guarda junto al original;
+        el nombre lleva el ancho en píxeles y la calidad (ej: header__1240px_q85.jpg)
+        para que otro layout no reutilice una versión de otro tamaño. Se regenera
+        si el original es más reciente.
+        El resultado se memoiza por proceso para no repetir los stat() en cada PDF.
+        """
+        target_px = int(target_width_mm / 25.4 * dpi)
+        cached = path.with_name(f"{path.stem}__{target_px}px_q{quality}.jpg")
+        if cached.exists() and cached.stat().st_mtime >= path.stat().st_mtime:
+            return cached
+
+        with Image.open(path) as img:
+            img = img.convert("RGB")
+            img.thumbnail((target_px, target_px * 10), Image.LANCZOS)  # no amplía
+            # Escritura atómica (tmp por proceso + os.replace): un worker en paralelo o
+            # una corrida interrumpida nunca ven un JPEG a medio escribir con mtime "al día"
+            tmp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+            img.save(tmp, "JPEG", quality=quality, optimize=True)
+        os.replace(tmp, cached)
+        return cached
+
+    def _preload_template(self, path: Path) -> str:
+        """Embebe la plantilla en el caché de imágenes y devuelve su clave."""
+        key, _, _ = preload_image(self.image_cache, BytesIO(_template_bytes(path)))
+        return key
 
     # ─────────────── Header / Footer automáticos ───────────────
     def header(self):
         page_width = self.w
-        self.image(str(self.header_img), x=0, y=0, w=page_width)
+        self.image(self._header_key, x=0, y=0, w=page_width)
         self.ln(self.config.header_lift_after)
 
     def footer(self):
@@ -111,43 +267,86 @@ class CreatePrecostoPDF(FPDF):
         x = (page_width - footer_width) / 2
         y = page_height - self.config.footer_bottom_margin - self.config.footer_height
 
-        self.image(str(self.footer_img), x=x, y=y, w=footer_width)
+        self.image(self._footer_key, x=x, y=y, w=footer_width)
 
     # ─────────────── Tipografía / helpers ───────────────
     def new_page(self) -> None:
         self.add_page()
 
     def set_default_typography(self, size: int | None = None, bold: bool = False) -> None:
+        # Evita set_font() si (tamaño, negrita) no cambió; add_page() restaura la fuente
+        # tras header/footer, así que el estado sigue siendo válido entre páginas.
+        key = (size or self.config.default_font_size, bold)
+        if key == self._cur_font:
+            return
+        self._cur_font = key
         fam = self.config.default_font_family
         style = "B" if bold else ""
-        self.set_font(fam, style=style, size=size or self.config.default_font_size)
+        self.set_font(fam, style=style, size=key[0])
 
     @staticmethod
-    def _fecha_es(dt: datetime) -> str:
-        meses = {
-            1: "enero", 2: "febrero", 3: "marzo", 4: "abril",
-            5: "mayo", 6: "junio", 7: "julio", 8: "agosto",
-            9: "septiembre", 10: "octubre", 11: "noviembre", 12: "diciembre"
-        }
-        return f"{dt.day} de {meses[dt.month]} de {dt.year}"
+    @lru_cache(maxsize=32)
+    def _fecha_es(dt: date) -> str:
+        """'15 de octubre de 2026'. Memoizada: en un lote todos los PDFs comparten el día."""
+        return f"{dt.day} de {_MESES[dt.month]} de {dt.year}"
 
     @staticmethod
     def _money_cop(value) -> str:
         """Formatea en estilo COP: 60.000,00"""
         try:
             v = float(value)
-        except Exception:
+        except (ValueError, TypeError):
             return str(value)
-        # miles con punto y decimales con coma
-        s = f"{v:,.2f}"            # 60,000.00
-        s = s.replace(",", "X").replace(".", ",").replace("X", ".")  # 60.000,00
-        return s
+        # miles con punto y decimales con coma: 60,000.00 -> 60.000,00 (una sola pasada)
+        return f"{v:,.2f}".translate(_COP_TABLE)
+
+    @staticmethod
+    def _money_cop_series(s: pd.Series, v: pd.Series | None = None) -> pd.Series:
+        """
+        _money_cop() para una columna completa; lo no numérico se deja como texto.
+        'v' permite pasar la columna ya convertida con pd.to_numeric (evita re-parsear).
+        """
+        if v is None:
+            v = pd.to_numeric(s, errors="coerce")
+        ok = v.notna()
+        out = s.astype(str)
+        if ok.any():
+            out[ok] = v[ok].map("{:,.2f}".format).str.translate(_COP_TABLE)
+        return out
     
+    # Anchos por carácter, por fuente (fpdf2 suma anchos por carácter: son aditivos)
+    _char_widths: dict = {}
+
+    def _text_width_getter(self):
+        """
+        Devuelve texto -> ancho para la fuente actual, sumando anchos por carácter
+        memoizados entre llamadas e instancias (suma en C; solo los caracteres
+        nuevos se miden con get_string_width).
+        """
+        widths = self._char_widths.setdefault(
+            (self.font_family, self.font_style, self.font_size_pt, self.k), {}
+        )
+        get_w = widths.__getitem__
+
+        def text_w(txt: str) -> float:
+            try:
+                return sum(map(get_w, txt))
+            except KeyError:
+                for ch in txt:
+                    if ch not in widths:
+                        widths[ch] = self.get_string_width(ch)
+                return sum(map(get_w, txt))
+
+        return text_w
+
     def _nb_lines(self, w: float, txt: str, line_h: float) -> int:
         """
         Calcula cuántas líneas usará multi_cell() para un texto dado
         con el ancho 'w' y altura de línea 'line_h', usando el ancho real
-        de la fuente actual (get_string_width).
+        de la fuente actual. Mide cada palabra una vez (anchos por carácter
+        cacheados) y, con los anchos acumulados, salta de una vez hasta la
+        última palabra que cabe en la línea (bisect) en vez de probar
+        palabra por palabra.
         """
         if txt is None:
             return 1
@@ -155,6 +354,10 @@ class CreatePrecostoPDF(FPDF):
         if not s:
             return 1
 
+        max_w = w - 2  # 2mm de margen de seguridad
+        text_w = self._text_width_getter()
+        space_w = text_w(" ")
+
         # Maneja saltos de línea explícitos
         parts = s.split("\n")
         total = 0
@@ -164,15 +367,47 @@ class CreatePrecostoPDF(FPDF):
                 continue
 
             words = part.split(" ")
-            line = ""
+            word_w = list(map(text_w, words))
+            # acc[k]: ancho agregado por las palabras [0, k) a una línea ya iniciada
+            # (espacio + palabra; las vacías de espacios dobles no suman)
+            acc = list(accumulate(
+                (space_w + ww if wd else 0.0 for wd, ww in zip(words, word_w)), initial=0.0
+            ))
+
+            # Caso común: el párrafo completo cabe en una línea
+            if (acc[-1] - space_w if acc[-1] else 0.0) <= max_w:
+                total += 1
+                continue
+
+            n = len(words)
+            line_w = 0.0
+            line_empty = True
             lines = 1
-            for wd in words:
-                test = (line + " " + wd).strip()
-                if self.get_string_width(test) <= (w - 2):  # 2mm de margen de seguridad
-                    line = test
+            j = 0
+            while j < n:
+                if not line_empty and line_w <= max_w:
+                    # Salto: última palabra m tal que la línea sigue cabiendo
+                    m = bisect_right(acc, acc[j] + (max_w - line_w), lo=j) - 1
+                    if m > j:
+                        line_w += acc[m] - acc[j]
+                        j = m
+                        continue
+                # Palabra a palabra (inicio de línea, palabra más ancha que la celda)
+                wd, wd_w = words[j], word_w[j]
+                if line_empty:
+                    test_w = wd_w
+                elif not wd:  # espacio doble: no agrega ancho
+                    test_w = line_w
+                else:
+                    test_w = line_w + space_w + wd_w
+                if test_w <= max_w:
+                    line_w = test_w
+                    line_empty = line_empty and not wd
                 else:
                     lines += 1
-                    line = wd
+                    line_w = wd_w
+                    line_empty = not wd
+                j += 1
             total += lines
         return max(1, total)
 
@@ -180,41 +415,105 @@ class CreatePrecostoPDF(FPDF):
     def _safe_upper(s: str) -> str:
         return (s or "").strip().upper()
 
+    # Anchos de rótulos fijos, compartidos entre instancias (las métricas core no cambian)
+    _label_widths: dict = {}
+
+    def _label_width(self, text: str) -> float:
+        """get_string_width() memoizado por (fuente, estilo, tamaño, unidad, texto)."""
+        key = (self.font_family, self.font_style, self.font_size_pt, self.k, text)
+        w = self._label_widths.get(key)
+        if w is None:
+            w = self._label_widths[key] = self.get_string_width(text)
+        return w
+
+    # Cortes de línea de párrafos justificados, compartidos entre instancias (lotes).
+    # LRU acotado: en un lote se repite el mismo resumen, no hacen falta más entradas
+    _paragraph_lines: OrderedDict = OrderedDict()
+    _PARAGRAPH_LINES_MAX = 8
+
+    def _justified_paragraph(self, h: float, text: str) -> None:
+        """
+        Equivale a multi_cell(0, h, text, align="J") (sin borde ni relleno), pero
+        memoiza el corte de líneas por (texto, ancho, fuente): en un lote con el
+        mismo resumen el algoritmo de corte de fpdf2 corre una sola vez.
+
+        Depende de APIs internas de fpdf2 (MultiLineBreak, TextLine,
+        _preload_font_styles, _perform_page_break_if_need_be y
+        _render_styled_text_line): requiere exactamente la versión fijada en
+        requirements.txt (fpdf2==2.8.4); revisar este método al actualizarla.
+        """
+        w = self.w - self.r_margin - self.x
+        text = self.normalize_text(text).replace("\r", "")
+        key = (text, w, self.font_family, self.font_style, self.font_size_pt, self.k)
+        cache = self._paragraph_lines
+        lines = cache.get(key)
+        if lines is not None:
+            cache.move_to_end(key)
+        else:
+            breaker = MultiLineBreak(
+                self._preload_font_styles(text, False),
+                w,
+                [self.c_margin, self.c_margin],
+                align=Align.J,
+            )
+            lines = []
+            while (tl := breaker.get_line()) is not None:
+                line_txt = "".join(f.string for f in tl.fragments)
+                lines.append((line_txt, tl.text_width, tl.number_of_spaces, tl.align, tl.trailing_nl))
+            cache[key] = lines = tuple(lines)
+            if len(cache) > self._PARAGRAPH_LINES_MAX:
+                cache.popitem(last=False)
+
+        for i, (line_txt, text_width, spaces, align, trailing_nl) in enumerate(lines):
+            self._perform_page_break_if_need_be(h)
+            is_last = i == len(lines) - 1
+            self._render_styled_text_line(
+                TextLine(
+                    self._preload_font_styles(line_txt, False),
+                    text_width=text_width,
+                    number_of_spaces=spaces,
+                    align=align,
+                    height=h,
+                    max_width=w,
+                    trailing_nl=trailing_nl,
+                ),
+                h=h,
+                new_x=XPos.RIGHT if is_last else XPos.LEFT,
+                new_y=YPos.NEXT,
+                border=0,
+                fill=False,
+            )
+        if lines and lines[-1][4]:
+            self.ln()
+
     # ─────────────── Lugares ───────────────
     @staticmethod
     def _infer_lugares_text(df_lugares) -> str:
+        if df_lugares is None:
+            return ""
         try:
+            if df_lugares.empty:
+                return ""
             cols = list(df_lugares.columns)
-        except Exception:
+        except AttributeError:
             return ""
 
-        preferidas = [
-            "LUGAR_EJECUCION", "LUGAR", "LUGAR DE EJECUCIÓN", "LUGAR DE EJECUCION",
-            "UBICACION", "UBICACIÓN", "DESCRIPCION_LUGAR", "DESCRIPCIÓN", "DESCRIPCION"
-        ]
-
-        col = None
         upper_map = {str(c).strip().upper(): c for c in cols}
-        for p in preferidas:
-            if p.upper() in upper_map:
-                col = upper_map[p.upper()]
-                break
+        col = next((upper_map[p] for p in _PREFERIDAS_LUGAR if p in upper_map), None)
         if col is None and cols:
             col = cols[0]
         if col is None:
             return ""
 
-        seen = set()
-        items = []
-        for v in df_lugares[col].tolist():
-            s = str(v).strip()
-            if not s or s.lower() == "nan":
-                continue
-            key = s.lower()
-            if key not in seen:
-                seen.add(key)
-                items.append(s)
-        return ", ".join(items)
+        # Vectorizado: limpieza + deduplicado sin distinguir mayúsculas (conserva el primero)
+        s = df_lugares[col].astype("string").str.strip()
+        lower = s.str.lower()
+        mask = s.notna() & (s.str.len() > 0) & (lower != "nan")
+        keys = lower[mask].tolist()
+        vals = s[mask].tolist()
+        # Deduplicado con dicts (bucle en C): primera grafía por clave, en orden de aparición
+        primera = dict(zip(reversed(keys), reversed(vals)))
+        return ", ".join(primera[k] for k in dict.fromkeys(keys))
 
     # ─────────────── Fechas / filtro BD ───────────────
     @staticmethod
@@ -230,35 +529,31 @@ class CreatePrecostoPDF(FPDF):
         if not s or s.lower() == "nan":
             return None
 
-        # intentos típicos
-        for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d"):
+        # intentos típicos: solo los formatos con el separador presente en el texto
+        for fmt in (_DATE_FORMATS_DASH if "-" in s else _DATE_FORMATS_SLASH):
             try:
                 return datetime.strptime(s, fmt).date()
-            except Exception:
+            except ValueError:
                 pass
 
-        # último intento: solo números separados
+        # último intento: solo números separados (d/m/yyyy o m/d/yyyy)
+        m = _NUM_DATE_RE.fullmatch(s)
+        if m is None:
+            return None
+        da, db, dc = (int(g) for g in m.groups())
         try:
-            parts = [p for p in s.replace(".", "/").replace("-", "/").split("/") if p]
-            if len(parts) == 3:
-                a, b, c = parts
-                # heurística dayfirst
-                if len(c) == 4:
-                    # a/b/c
-                    da = int(a); db = int(b); dc = int(c)
-                    # si a > 12 => dayfirst
-                    if da > 12:
-                        return date(dc, db, da)
-                    # si b > 12 => monthfirst
-                    if db > 12:
-                        return date(dc, da, db)
-                    # por defecto dayfirst
-                    return date(dc, db, da)
-        except Exception:
+            # heurística dayfirst
+            # si a > 12 => dayfirst
+            if da > 12:
+                return date(dc, db, da)
+            # si b > 12 => monthfirst
+            if db > 12:
+                return date(dc, da, db)
+            # por defecto dayfirst
+            return date(dc, db, da)
+        except ValueError:
             return None
 
-        return None
-
     @staticmethod
     def _detect_date_columns(df) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """
@@ -266,51 +561,57 @@ class CreatePrecostoPDF(FPDF):
         - Si existe una sola columna fecha -> col_fecha_unica
         - Si existe par inicio/fin -> col_inicio y col_fin
         """
-        cols = [str(c).strip() for c in df.columns]
-        U = {c.upper(): c for c in cols}
-
-        # candidatos
-        fecha_unica = None
-        inicio = None
-        fin = None
-
-        # una sola fecha
-        for key in ["FECHA", "FECHA_ACTIVIDAD", "FECHA_EJECUCION", "FECHA EJECUCION", "DATE"]:
-            if key in U:
-                fecha_unica = U[key]
-                break
-
-        # rango
-        for key in ["FECHA_INICIO", "INICIO", "FECHA INICIO", "START", "DESDE"]:
-            if key in U:
-                inicio = U[key]
-                break
-
-        for key in ["FECHA_FIN", "FIN", "FECHA FIN", "END", "HASTA"]:
-            if key in U:
-                fin = U[key]
-                break
+        found = _date_colmap(tuple(df.columns))
+        inicio, fin = found.get("inicio"), found.get("fin")
 
         # Si hay rango, priorizar rango
         if inicio and fin:
             return (None, inicio, fin)
 
-        return (fecha_unica, None, None)
+        return (found.get("fecha"), None, None)
+
+    @classmethod
+    def prepare_bd(cls, bd_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Parsea una sola vez las columnas fecha detectadas (ej: FECHA -> __FECHA_DT__)
+        para que filter_bd_by_range y CREATE_RESUME no vuelvan a parsearlas.
+        Modifica el BD en sitio y lo devuelve.
+        """
+        return prepare_dates(bd_df, [c for c in cls._detect_date_columns(bd_df) if c])
 
-    def filter_bd_by_range(self, bd_df, fecha_inicio, fecha_fin):
+    def filter_bd_by_range(
+        self,
+        bd_df,
+        fecha_inicio,
+        fecha_fin,
+        exclude_ids: tuple[str, ...] = ("1.21",),
+    ):
         """
         Filtra el dataframe BD por fechas:
         - Si existe columna FECHA: inicio <= FECHA <= fin  (comparación por SOLO fecha, sin hora)
         - Si existe INICIO/FIN en BD: intersección de rangos con [inicio, fin] (solo fecha)
-        - Si no hay columnas fecha detectables: retorna BD completo
+        - Si no hay columnas fecha detectables: no filtra por fecha
+        Además excluye las filas cuyo ID_ITEM esté en 'exclude_ids'
+        (ej: 1.21 = "Llenado de tanques"). Ambas condiciones van en una sola máscara.
         """
         if bd_df is None:
             return None
 
+        mask = self._date_mask(bd_df, fecha_inicio, fecha_fin)
+
+        if exclude_ids and "ID_ITEM" in bd_df.columns:
+            keep = ~bd_df["ID_ITEM"].astype(str).str.strip().isin(exclude_ids)
+            mask = keep if mask is None else mask & keep
+
+        # Sin copia del BD: solo se indexan las filas que cumplen la máscara
+        return bd_df if mask is None else bd_df.loc[mask]
+
+    def _date_mask(self, bd_df, fecha_inicio, fecha_fin) -> pd.Series | None:
+        """Máscara booleana del rango de fechas; None si no aplica filtro por fecha."""
         ini = self._to_date(fecha_inicio)
         fin = self._to_date(fecha_fin)
         if ini is None or fin is None:
-            return bd_df
+            return None
 
         # ✅ Asegurar que ini/fin sean date (sin hora)
         if hasattr(ini, "date"):
@@ -320,54 +621,56 @@ class CreatePrecostoPDF(FPDF):
 
         col_fecha, col_ini, col_fin = self._detect_date_columns(bd_df)
 
-        df = bd_df.copy()
+        # Comparación por día: Timestamps a medianoche vs columnas normalizadas (NaT -> False).
+        # Si el BD pasó por prepare_bd, se reutilizan las fechas ya parseadas
+        ini_ts, fin_ts = pd.Timestamp(ini), pd.Timestamp(fin)
 
         if col_fecha:
-            # ✅ Convertir FECHA a date (sin hora) de forma robusta
-            fechas = pd.to_datetime(df[col_fecha], errors="coerce")
-            df["_FECHA_"] = fechas.dt.date
-            df = df[df["_FECHA_"].notna()]
-            df = df[(df["_FECHA_"] >= ini) & (df["_FECHA_"] <= fin)]
-            df = df.drop(columns=["_FECHA_"], errors="ignore")
-            return df
+            fechas = day_series(bd_df, col_fecha)
+            return (fechas >= ini_ts) & (fechas <= fin_ts)
 
         if col_ini and col_fin:
-            # ✅ Convertir INI/FIN a date (sin hora) de forma robusta
-            ini_dt = pd.to_datetime(df[col_ini], errors="coerce")
-            fin_dt = pd.to_datetime(df[col_fin], errors="coerce")
-            df["_INI_"] = ini_dt.dt.date
-            df["_FIN_"] = fin_dt.dt.date
-            df = df[df["_INI_"].notna() & df["_FIN_"].notna()]
-
+            ini_bd = day_series(bd_df, col_ini)
+            fin_bd = day_series(bd_df, col_fin)
             # Intersección: (ini <= FIN_BD) y (fin >= INI_BD)
-            df = df[(ini <= df["_FIN_"]) & (fin >= df["_INI_"])]
-            df = df.drop(columns=["_INI_", "_FIN_"], errors="ignore")
-            return df
+            return (fin_bd >= ini_ts) & (ini_bd <= fin_ts)
 
-        return df
+        return None
 
 
     # ─────────────── Tabla ───────────────
     @staticmethod
     def _detect_table_columns(df) -> dict:
-        cols = [str(c).strip() for c in df.columns]
-        U = {c.upper(): c for c in cols}
-
-        def pick(*candidates):
-            for k in candidates:
-                kk = k.upper()
-                if kk in U:
-                    return U[kk]
-            return None
+        found = _table_colmap(tuple(df.columns))
+        return {key: found.get(key) for key in _TABLE_COLUMNS}
 
-        return {
-            "item": pick("ID_ITEM", "ID ÍTEM", "ID_ITEM ", "ITEM", "ÍTEM", "COD_ITEM"),
-            "descripcion": pick("ACTIVIDAD", "DESCRIPCION", "DESCRIPCIÓN", "DESCRIPCION_ACTIVIDAD"),
-            "unidad": pick("UNIDAD_MEDIDA", "UNIDAD", "UND"),
-            "cantidad": pick("CANTIDAD", "CANT"),
-            "v_unit": pick("VALOR_UNITARIO", "VR_UNITARIO", "VLR_UNITARIO", "PRECIO_UNITARIO"),
-            "v_total": pick("VALOR_TOTAL", "VR_TOTAL", "VLR_TOTAL", "TOTAL"),
-        }
+    def _table_rows(self, df) -> tuple[list[tuple[str, ...]], float]:
+        """
+        Prepara las filas de la tabla en una sola pasada vectorizada:
+        - (ítem, descripción, unidad, cantidad, "$  v_unit", "$  v_total") como texto
+        - total general = suma de VALOR_TOTAL (valores no numéricos cuentan como 0)
+        """
+        colmap = self._detect_table_columns(df)
+        vacia = pd.Series("", index=df.index)
+
+        def col(key):
+            return df[colmap[key]] if colmap[key] else vacia
+
+        item = col("item").astype(str).str.strip()
+        desc = col("descripcion").astype(str).str.strip()
+        und = col("unidad").astype(str).str.strip()
+        cant = col("cantidad").astype(str)
+        vunit = _COP_PREFIX + self._money_cop_series(col("v_unit"))
+        # VALOR_TOTAL se convierte una sola vez: sirve para el texto y para el total
+        vtotal_num = pd.to_numeric(col("v_total"), errors="coerce")
+        vtotal = _COP_PREFIX + self._money_cop_series(col("v_total"), vtotal_num)
+        total_general = float(vtotal_num.fillna(0.0).sum())
+
+        filas = list(zip(
+            item.tolist(), desc.tolist(), und.tolist(),
+            cant.tolist(), vunit.tolist(), vtotal.tolist(),
+        ))
+        return filas, total_general
 
     def _write_section_table(
         self,
@@ -439,42 +742,28 @@ class CreatePrecostoPDF(FPDF):
         # Dibujar encabezado inicial
         _draw_table_header()
 
-        # Detectar columnas del df
-        colmap = self._detect_table_columns(bd_filtrado)
-
-        # Render filas
-        total_general = 0.0
+        # Columnas ya formateadas (vectorizado) + total general
+        filas, total_general = self._table_rows(bd_filtrado)
 
         # Parámetros consistentes
         line_h = 5.5
         pad = 1
 
+        # Líneas por descripción (ancho y fuente de filas son fijos en esta tabla)
+        line_cache: dict[str, int] = {}
+
         # Desactivar auto page break durante la tabla (lo manejamos manual)
         old_apb = self.auto_page_break
         old_bm = self.b_margin
         self.set_auto_page_break(auto=False, margin=self.b_margin)
 
         try:
-            for _, row in bd_filtrado.iterrows():
-                item = str(row[colmap["item"]]).strip() if colmap["item"] else ""
-                desc = str(row[colmap["descripcion"]]).strip() if colmap["descripcion"] else ""
-                und  = str(row[colmap["unidad"]]).strip() if colmap["unidad"] else ""
-                cant = row[colmap["cantidad"]] if colmap["cantidad"] else ""
-                vunit = row[colmap["v_unit"]] if colmap["v_unit"] else ""
-                vtotal = row[colmap["v_total"]] if colmap["v_total"] else ""
-
-                # Total general (robusto)
-                try:
-                    if hasattr(self, "_parse_number"):
-                        total_general += float(self._parse_number(vtotal))
-                    else:
-                        total_general += float(vtotal)
-                except Exception:
-                    pass
-
+            for item, desc, und, cant, vunit, vtotal in filas:
                 # Calcular altura real de la fila según descripción
                 self.set_default_typography(size=10, bold=False)  # importante antes de medir
-                lines = self._nb_lines(w_desc - 2 * pad, desc, line_h)
+                lines = line_cache.get(desc)
+                if lines is None:
+                    lines = line_cache[desc] = self._nb_lines(w_desc - 2 * pad, desc, line_h)
                 row_h = (line_h * lines) + (2 * pad)
 
                 # --- salto de página MANUAL antes de dibujar la fila ---
@@ -490,11 +779,20 @@ class CreatePrecostoPDF(FPDF):
                 self.set_xy(x, y)
                 self.cell(w_item, row_h, item, border=1, align="C")
 
-                # 2) Descripción (rect + multi_cell con padding)
+                # 2) Descripción
                 self.set_xy(x + w_item, y)
-                self.rect(x + w_item, y, w_desc, row_h)  # borde exacto
-                self.set_xy(x + w_item + pad, y + pad)
-                self.multi_cell(w_desc - 2 * pad, line_h, desc, border=0, align="L")
+                if lines == 1:
+                    # Una línea (caso común): un solo cell con borde, sin el corte de multi_cell.
+                    # c_margin + pad deja el texto en la misma x que el multi_cell con padding.
+                    c_margin = self.c_margin
+                    self.c_margin = c_margin + pad
+                    self.cell(w_desc, row_h, desc, border=1, align="L")
+                    self.c_margin = c_margin
+                else:
+                    # rect + multi_cell con padding
+                    self.rect(x + w_item, y, w_desc, row_h)  # borde exacto
+                    self.set_xy(x + w_item + pad, y + pad)
+                    self.multi_cell(w_desc - 2 * pad, line_h, desc, border=0, align="L")
 
                 # 3) Unidad
                 self.set_xy(x + w_item + w_desc, y)
@@ -502,15 +800,15 @@ class CreatePrecostoPDF(FPDF):
 
                 # 4) Cantidad
                 self.set_xy(x + w_item + w_desc + w_und, y)
-                self.cell(w_cant, row_h, str(cant), border=1, align="C")
+                self.cell(w_cant, row_h, cant, border=1, align="C")
 
                 # 5) Valor Unitario
                 self.set_xy(x + w_item + w_desc + w_und + w_cant, y)
-                self.cell(w_vu, row_h, f"$  {self._money_cop(vunit)}", border=1, align="R")
+                self.cell(w_vu, row_h, vunit, border=1, align="R")
 
                 # 6) Valor Total
                 self.set_xy(x + w_item + w_desc + w_und + w_cant + w_vu, y)
-                self.cell(w_vt, row_h, f"$  {self._money_cop(vtotal)}", border=1, align="R")
+                self.cell(w_vt, row_h, vtotal, border=1, align="R")
 
                 # Bajar al final de la fila
                 self.set_y(y + row_h)
@@ -534,7 +832,7 @@ class CreatePrecostoPDF(FPDF):
 
             # Valor del total en la columna Valor Total (solo w_vt)
             self.set_default_typography(size=9, bold=True)  # baja un poco la fuente para números grandes
-            self.cell(w_vt, 8, f"$  {self._money_cop(total_general)}", border=1, align="R", fill=True)
+            self.cell(w_vt, 8, _COP_PREFIX + self._money_cop(total_general), border=1, align="R", fill=True)
 
             # Volver a fuente normal
             self.set_default_typography(size=10, bold=False)
@@ -573,7 +871,7 @@ class CreatePrecostoPDF(FPDF):
         if self.get_y() + needed_space > (self.h - self.b_margin):
             self.add_page()
 
-        self.image(str(self.signature_img), x=x_img, y=self.get_y(), w=sig_w)
+        self.image(BytesIO(_template_bytes(self.signature_img)), x=x_img, y=self.get_y(), w=sig_w)
         self.ln(45)  # avance vertical después de la imagen (ajusta según tu firma.png)
 
 
@@ -596,8 +894,6 @@ class CreatePrecostoPDF(FPDF):
         - Lugar de ejecución (desde df_lugares)
         - Tabla de actividades filtradas por [fecha_inicio, fecha_fin] desde bd
         """
-        self._bd = bd
-
         self.new_page()
 
         # Código (derecha)
@@ -607,7 +903,7 @@ class CreatePrecostoPDF(FPDF):
         # Ciudad + fecha
         self.ln(2)
         self.set_default_typography(size=12, bold=True)
-        self.cell(0, 6, f"Santiago de Cali, {self._fecha_es(datetime.now())}", ln=1, align="L")
+        self.cell(0, 6, f"Santiago de Cali, {self._fecha_str}", ln=1, align="L")
 
         # Señores
         self.ln(6)
@@ -616,29 +912,25 @@ class CreatePrecostoPDF(FPDF):
 
         self.ln(4)
         self.set_default_typography(size=12, bold=True)
-        self.multi_cell(0, 6, "SOCIEDAD PORTUARIA REGIONAL DE BUENAVENTURA", align="L")
+        self.cell(0, 6, "SOCIEDAD PORTUARIA REGIONAL DE BUENAVENTURA", ln=1, align="L")  # una línea: sin multi_cell
 
         # Resumen
         self.ln(3)
         self.set_default_typography(size=11, bold=False)
-        self.multi_cell(0, 6, resumen.strip(), align="J")
+        self._justified_paragraph(6, resumen.strip())
 
         # Lugar ejecución
         lugares_txt = self._infer_lugares_text(df_lugares)
         if lugares_txt:
             self.ln(4)
             self.set_default_typography(size=11, bold=True)
-            self.cell(self.get_string_width("Lugar de ejecución:") + 1, 6, "Lugar de ejecución:", ln=0)
+            self.cell(self._label_width("Lugar de ejecución:") + 1, 6, "Lugar de ejecución:", ln=0)
             self.set_default_typography(size=11, bold=False)
             self.multi_cell(0, 6, f" {lugares_txt}", align="L")
 
-        # Tabla actividades (filtrada por fechas)
+        # Tabla actividades (filtrada por fechas, sin ID_ITEM excluidos como 1.21)
         bd_filtrado = self.filter_bd_by_range(bd, fecha_inicio, fecha_fin)
 
-        # Excluir actividades por ID_ITEM (ej: 1.21 = "Llenado de tanques")
-        if bd_filtrado is not None and "ID_ITEM" in bd_filtrado.columns:
-            bd_filtrado = bd_filtrado[bd_filtrado["ID_ITEM"].astype(str).str.strip() != "1.21"]
-
         # Para el título amarillo usamos un "título corto" del lugar:
         lugar_titulo = ""
         if lugares_txt:
@@ -651,13 +943,84 @@ class CreatePrecostoPDF(FPDF):
 
     # ─────────────── Guardado ───────────────
     def default_output_path(self, cod_prec: str | None = None) -> Path:
-        self._output_dir.mkdir(parents=True, exist_ok=True)
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        code_part = (cod_prec or self.config.output_prefix).replace(" ", "_")
-        filename = f"{self.config.output_prefix}_{code_part}_{date_str}.pdf"
+        if self._output_dir not in _ensured_dirs:
+            self._output_dir.mkdir(parents=True, exist_ok=True)
+            _ensured_dirs.add(self._output_dir)
+        code_part = (cod_prec or self.config.output_prefix).translate(_SAFE_FILENAME)
+        filename = f"{self.config.output_prefix}_{code_part}_{self._date_str}.pdf"
         return self._output_dir / filename
 
     def save(self, path: Path | None = None, cod_prec: str | None = None) -> Path:
         out_path = path or self.default_output_path(cod_prec=cod_prec)
-        self.output(str(out_path))
+        # output() sin nombre devuelve el bytearray ya serializado: se escribe en una sola pasada
+        with open(out_path, "wb", buffering=1 << 20) as f:
+            f.write(self.output())
         return out_path
+
+    # ─────────────── Lote ───────────────
+    @classmethod
+    def render_batch(
+        cls,
+        items: list[PrecosteoSpec],
+        config: PDFLayoutConfig | None = None,
+    ) -> list[Path]:
+        """
+        Genera un PDF por cada PrecosteoSpec y lo escribe a disco de inmediato:
+        - Solo un documento en memoria a la vez
+        - Rutas, plantillas reducidas y bytes de imágenes se comparten (cachés de módulo)
+        """
+        paths = []
+        for spec in items:
+            pdf = cls(config)
+            pdf.render_precosteo(
+                codigo_precosteo=spec.codigo_precosteo,
+                resumen=spec.resumen,
+                df_lugares=spec.df_lugares,
+                fecha_inicio=spec.fecha_inicio,
+                fecha_fin=spec.fecha_fin,
+                bd=spec.bd,
+            )
+            paths.append(pdf.save(path=spec.path, cod_prec=spec.codigo_precosteo))
+        return paths
+
+
+# ─────────────── Lote en paralelo ───────────────
+# BD compartida por todo el lote: se envía una vez por proceso (initializer), no por precosteo
+_WORKER_BD: pd.DataFrame | None = None
+
+
+def _init_worker(bd: pd.DataFrame | None) -> None:
+    global _WORKER_BD
+    _WORKER_BD = bd
+
+
+def render_one(spec: PrecosteoSpec, config: PDFLayoutConfig | None = None) -> Path:
+    """Worker de proceso: arma y guarda un solo precosteo (usa la BD del proceso si spec.bd es None)."""
+    if spec.bd is None and _WORKER_BD is not None:
+        spec = replace(spec, bd=_WORKER_BD)
+    return CreatePrecostoPDF.render_batch([spec], config)[0]
+
+
+def render_many_parallel(
+    specs: list[PrecosteoSpec],
+    workers: int | None = None,
+    config: PDFLayoutConfig | None = None,
+) -> list[Path]:
+    """
+    Igual que CreatePrecostoPDF.render_batch() pero repartiendo los precosteos
+    entre procesos (el render de fpdf2 es CPU-bound y no libera el GIL).
+    Si todos comparten la misma BD, se serializa una sola vez por worker.
+    Devuelve las rutas en el mismo orden de 'specs'.
+    """
+    if not specs:
+        return []
+
+    workers = min(workers or os.cpu_count() or 1, len(specs))
+    shared_bd = specs[0].bd if all(s.bd is specs[0].bd for s in specs) else None
+    if shared_bd is not None:
+        specs = [replace(s, bd=None) for s in specs]
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(shared_bd,)
+    ) as ex:
+        return list(ex.map(render_one, specs, repeat(config)))
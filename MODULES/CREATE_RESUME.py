@@ -1,26 +1,95 @@
 import os
+import asyncio
+import json
+import hashlib
+import time
 import pandas as pd
 from datetime import datetime
+from io import StringIO
+from pathlib import Path
 from dotenv import load_dotenv
 from google import genai
+from google.genai import types
+
+from MODULES.BD_FECHAS import day_series, prepare_dates
+
+# Caché de resúmenes: en disco (entre ejecuciones) + en memoria (mismo proceso)
+_CACHE_DIR = Path(__file__).resolve().parents[1] / "BD" / ".resume_cache"
+_RESUMENES: dict[str, str] = {}
+
+# Índice para la caché por similitud: una línea JSON por resumen guardado
+_INDICE_PATH = _CACHE_DIR / "index.jsonl"
+_INDICE: list[dict] | None = None  # cargado bajo demanda
+
+# Modo batch de Gemini (~50% del costo; sin respuesta inmediata): estados finales del job
+_BATCH_FINALES = {
+    "JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED",
+    "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED",
+}
+_BATCH_ESPERA_MAX_S = 60  # tope del backoff exponencial entre consultas (2, 4, 8, ... 60 s)
+_BATCH_MAX_REQUESTS = 100  # requests inline por batch job
+_BATCH_TIMEOUT_S = 24 * 3600  # espera total máxima por job (el SLO de batch es 24 h)
+
+
+# Estimación local de tokens para el presupuesto del prompt (~4 caracteres por token)
+_CHARS_POR_TOKEN = 4
+
+# Un solo cliente Gemini por proceso: .env leído una vez y sesión HTTP reutilizada entre instancias
+_CLIENT: genai.Client | None = None
+
+
+def _get_client() -> genai.Client:
+    global _CLIENT
+    if _CLIENT is None:
+        load_dotenv()
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("❌ No se encontró GEMINI_API_KEY en tu .env")
+        _CLIENT = genai.Client(api_key=api_key)
+    return _CLIENT
 
 
 class CREATE_RESUME:
+    # Instrucciones fijas: van como system_instruction (prefijo idéntico en cada llamada,
+    # aprovechable por la caché de prompts de Gemini); el prompt de usuario solo lleva lo variable
+    _SYSTEM_INSTRUCTION = """Eres un ingeniero encargado de elaborar informes técnicos de mantenimiento.
+Redactas resúmenes generales de las actividades realizadas en un rango de fechas.
+
+REQUISITOS:
+- Un solo párrafo (máximo 6-8 líneas).
+- Español profesional, tono técnico.
+- Tercera persona.
+- No enumerar actividades una por una.
+- No inventar datos numéricos."""
+    _GEN_CONFIG = types.GenerateContentConfig(system_instruction=_SYSTEM_INSTRUCTION)
+
     def __init__(
         self,
         bd: pd.DataFrame,
         fecha_inicial: str,
         fecha_final: str,
         model_name: str = "gemini-2.0-flash",
-        max_unique_activities: int = 250,
+        max_unique_activities: int | None = None,
+        max_prompt_tokens: int | None = 4000,
+        similarity_threshold: float | None = None,
+        use_batch: bool = False,
     ):
-        self.bd = bd.copy()
         self.fecha_inicial = self._format_date_mmddyyyy(fecha_inicial)
         self.fecha_final = self._format_date_mmddyyyy(fecha_final)
         self.model_name = model_name
-        self.max_unique_activities = max_unique_activities
+        self.max_unique_activities = max_unique_activities  # tope opcional por cantidad
+        self.max_prompt_tokens = max_prompt_tokens  # tope por tokens estimados de las viñetas
+        self.similarity_threshold = similarity_threshold  # opcional: ver _buscar_similar
+        self.use_batch = use_batch  # para scripts sin apuro: la mitad del costo, más latencia
 
-        self._validar_dataframe()
+        self._validar_dataframe(bd)
+        # Solo las columnas que se usan, como referencias (sin copiar el BD).
+        # FECHA reutiliza __FECHA_DT__ si el BD pasó por prepare_bd (compartido con el precosteo)
+        self._actividad = bd["ACTIVIDAD"]
+        self._fechas = day_series(bd, "FECHA") if "FECHA" in bd.columns else None
+
+        # Sin caché en disco: la lista sale de los valores distintos del rango (pd.unique),
+        # más barato que cualquier huella del contenido que haría falta para invalidarla
         self.actividades_unicas = self._obtener_actividades_unicas()
         self._configurar_gemini()
 
@@ -34,60 +103,316 @@ class CREATE_RESUME:
                 continue
         raise ValueError(f"❌ Formato de fecha inválido: {fecha}. Use MM/DD/YYYY.")
 
-    def _validar_dataframe(self):
-        if "ACTIVIDAD" not in self.bd.columns:
+    @staticmethod
+    def prepare_bd(bd: pd.DataFrame) -> pd.DataFrame:
+        """Parsea FECHA una sola vez (-> __FECHA_DT__); modifica el BD en sitio y lo devuelve."""
+        return prepare_dates(bd, ("FECHA",))
+
+    @staticmethod
+    def _validar_dataframe(bd: pd.DataFrame):
+        if "ACTIVIDAD" not in bd.columns:
             raise ValueError("❌ El DataFrame no contiene la columna 'ACTIVIDAD'")
 
+    def _actividades_en_rango(self) -> pd.Series:
+        """ACTIVIDAD de las filas cuya FECHA cae en el rango (máscara, sin copiar el BD)."""
+        if self._fechas is None:
+            return self._actividad
+        fi = pd.Timestamp(datetime.strptime(self.fecha_inicial, "%m/%d/%Y"))
+        ff = pd.Timestamp(datetime.strptime(self.fecha_final, "%m/%d/%Y"))
+        return self._actividad.loc[self._fechas.between(fi, ff)]
+
+    @staticmethod
+    def _clean_str(x) -> str:
+        """Colapsa espacios en blanco (tabs, saltos de línea) a uno solo y recorta, sin regex."""
+        return " ".join(str(x).split())
+
+    @staticmethod
+    def _estimar_tokens(actividad: str) -> int:
+        """Tokens aproximados de una viñeta ("\\n- " + texto), sin llamar al tokenizador remoto."""
+        return len(actividad) // _CHARS_POR_TOKEN + 2
+
     def _obtener_actividades_unicas(self) -> list[str]:
-        serie = (
-            self.bd["ACTIVIDAD"]
-            .dropna()
-            .astype(str)
-            .str.replace(r"\s+", " ", regex=True)
-            .str.strip()
-        )
-        serie = serie[serie != ""]
-        unicas = pd.unique(serie).tolist()
-        return unicas[: self.max_unique_activities]
+        # Las ACTIVIDAD se repiten mucho en el BD: se limpia cada texto distinto una sola vez
+        # (pd.unique conserva el orden de primera aparición)
+        crudas = pd.unique(self._actividades_en_rango().dropna())
 
-    def _configurar_gemini(self):
-        load_dotenv()
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("❌ No se encontró GEMINI_API_KEY en tu .env")
-        self.client = genai.Client(api_key=api_key)
+        # Únicas sin distinguir mayúsculas ("Limpieza" == "LIMPIEZA"): prompt más corto.
+        # MAYÚSCULAS -> primera forma vista. Presupuesto de tokens (y tope de cantidad, si
+        # se dio): una actividad larga pesa más que una corta. La que no cabe se salta y se
+        # sigue con las demás; si al final ninguna cupo, va la primera larga recortada
+        max_n, max_tokens = self.max_unique_activities, self.max_prompt_tokens
+        unicas: dict[str, str] = {}
+        tokens = 0
+        primera_larga = None
+        for cruda in crudas:
+            if max_n is not None and len(unicas) >= max_n:
+                break
+            if max_tokens is not None and max_tokens - tokens < self._estimar_tokens(""):
+                break  # ya no cabe ni una viñeta vacía
+            act = self._clean_str(cruda)
+            if not act or act.upper() in unicas:
+                continue
+            costo = self._estimar_tokens(act)
+            if max_tokens is not None and tokens + costo > max_tokens:
+                primera_larga = primera_larga or act
+                continue
+            tokens += costo
+            unicas[act.upper()] = act
 
-    def _build_prompt(self) -> str:
-        actividades_bullets = "\n- " + "\n- ".join(self.actividades_unicas)
-        return f"""
-Eres un ingeniero encargado de elaborar informes técnicos de mantenimiento.
+        if not unicas and primera_larga:
+            recorte = (max_tokens - self._estimar_tokens("") + 1) * _CHARS_POR_TOKEN - 1
+            return [primera_larga[:recorte].rstrip()] if recorte > 0 else []
+        return list(unicas.values())
 
-Con base en las actividades (únicas) realizadas entre {self.fecha_inicial} y {self.fecha_final},
-redacta un resumen general:
+    def _configurar_gemini(self):
+        self.client = _get_client()
 
-REQUISITOS:
-- Un solo párrafo (máximo 6-8 líneas).
-- Español profesional, tono técnico.
-- Tercera persona.
-- No enumerar actividades una por una.
-- No inventar datos numéricos.
+    def _user_prompt(self) -> str:
+        """Parte variable del prompt (rango + actividades); las instrucciones van en _SYSTEM_INSTRUCTION."""
+        # Un solo buffer: el texto final se arma una vez (sin string intermedio de viñetas)
+        buf = StringIO()
+        buf.write(f"""Con base en las actividades (únicas) realizadas entre {self.fecha_inicial} y {self.fecha_final},
+redacta un resumen general.
 
 ACTIVIDADES ÚNICAS:
-{actividades_bullets}
-""".strip()
+""")
+        for actividad in self.actividades_unicas:
+            buf.write("\n- ")
+            buf.write(actividad)
+        return buf.getvalue()
+
+    def generate_text(self, force_refresh: bool = False) -> str:
+        """
+        Resumen de las actividades del rango. Si el mismo conjunto de actividades
+        (mismas fechas y modelo) ya se resumió, devuelve el texto en caché sin
+        llamar a Gemini; con similarity_threshold, reutiliza también el resumen de
+        un conjunto casi igual (ver _buscar_similar). force_refresh=True ignora la
+        caché y la sobrescribe.
+        """
+        if not self.actividades_unicas:
+            return "No se encontraron actividades para generar el resumen."
+
+        key = self._cache_key()
+        cached = None if force_refresh else self._buscar_en_cache(key)
+        if cached is not None:
+            return cached
+
+        try:
+            if self.use_batch:
+                text = self._generate_batch(self._user_prompt())
+            else:
+                resp = self.client.models.generate_content(
+                    model=self.model_name,
+                    contents=self._user_prompt(),
+                    config=self._GEN_CONFIG,
+                )
+                text = (getattr(resp, "text", None) or "").strip()
+        except Exception as e:
+            raise RuntimeError(f"❌ Error al generar resumen con Gemini: {e}")
+
+        return self._registrar_respuesta(key, text)
+
+    def _generate_batch(self, prompt: str) -> str:
+        """Envía el prompt como batch job inline y espera el resultado."""
+        return self._run_batch(self.client, self.model_name, [prompt])[0]
+
+    @classmethod
+    def _run_batch(cls, client, model: str, prompts: list[str]) -> list[str]:
+        """
+        Un batch job inline (sin archivo en GCS) con un request por prompt; espera
+        consultando con backoff exponencial hasta _BATCH_TIMEOUT_S. Devuelve los textos
+        en el orden de 'prompts'.
+        """
+        job = client.batches.create(
+            model=model,
+            src=[
+                {
+                    "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                    "config": {"system_instruction": cls._SYSTEM_INSTRUCTION},
+                }
+                for prompt in prompts
+            ],
+        )
+        espera = 2
+        limite = time.monotonic() + _BATCH_TIMEOUT_S
+        estado = job.state.name if job.state else None  # state puede venir vacío
+        while estado not in _BATCH_FINALES:
+            if time.monotonic() >= limite:
+                raise RuntimeError(
+                    f"batch {job.name} sin terminar tras {_BATCH_TIMEOUT_S} s (estado: {estado})"
+                )
+            time.sleep(espera)
+            espera = min(espera * 2, _BATCH_ESPERA_MAX_S)
+            job = client.batches.get(name=job.name)
+            estado = job.state.name if job.state else None
+
+        if estado not in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"):
+            raise RuntimeError(f"batch {job.name} terminó en {estado}")
+        textos = []
+        for respuesta in job.dest.inlined_responses:
+            if respuesta.error:
+                raise RuntimeError(f"batch {job.name}: {respuesta.error}")
+            textos.append((getattr(respuesta.response, "text", None) or "").strip())
+        return textos
+
+    @classmethod
+    def generate_many_batch(cls, jobs: list[dict], force_refresh: bool = False) -> list[str]:
+        """
+        Varios resúmenes (ej: por semana o por mes) en un solo batch job de Gemini
+        por modelo, en lotes de hasta _BATCH_MAX_REQUESTS. Cada job son los kwargs de
+        CREATE_RESUME; los que ya están en caché no se envían. Devuelve los textos
+        en el orden de 'jobs'.
+        """
+        resumidores = [cls(**job) for job in jobs]
+        textos: list[str | None] = [None] * len(resumidores)
+        pendientes: dict[str, list[int]] = {}  # modelo -> índices sin caché
+
+        for i, r in enumerate(resumidores):
+            if not r.actividades_unicas:
+                textos[i] = "No se encontraron actividades para generar el resumen."
+                continue
+            cached = None if force_refresh else r._buscar_en_cache(r._cache_key())
+            if cached is not None:
+                textos[i] = cached
+            else:
+                pendientes.setdefault(r.model_name, []).append(i)
+
+        for modelo, indices in pendientes.items():
+            for ini in range(0, len(indices), _BATCH_MAX_REQUESTS):
+                lote = indices[ini:ini + _BATCH_MAX_REQUESTS]
+                try:
+                    respuestas = cls._run_batch(
+                        resumidores[lote[0]].client, modelo, [resumidores[i]._user_prompt() for i in lote]
+                    )
+                except Exception as e:
+                    raise RuntimeError(f"❌ Error al generar resumen con Gemini: {e}")
+                if len(respuestas) != len(lote):
+                    raise RuntimeError(
+                        f"❌ El batch de Gemini devolvió {len(respuestas)} respuestas para {len(lote)} resúmenes"
+                    )
+                for i, text in zip(lote, respuestas):
+                    textos[i] = resumidores[i]._registrar_respuesta(resumidores[i]._cache_key(), text)
+
+        return textos
 
-    def generate_text(self) -> str:
+    async def agenerate_text(self, force_refresh: bool = False) -> str:
+        """
+        Igual que generate_text() pero con el cliente async de Gemini (para asyncio.gather).
+        Siempre usa la API en tiempo real (use_batch no aplica aquí).
+        """
         if not self.actividades_unicas:
             return "No se encontraron actividades para generar el resumen."
 
-        prompt = self._build_prompt()
+        key = self._cache_key()
+        cached = None if force_refresh else self._buscar_en_cache(key)
+        if cached is not None:
+            return cached
 
         try:
-            resp = self.client.models.generate_content(
+            resp = await self.client.aio.models.generate_content(
                 model=self.model_name,
-                contents=prompt
+                contents=self._user_prompt(),
+                config=self._GEN_CONFIG,
             )
-            text = getattr(resp, "text", None)
-            return (text or "").strip() or "No se pudo obtener texto desde Gemini (respuesta vacía)."
+            text = (getattr(resp, "text", None) or "").strip()
         except Exception as e:
             raise RuntimeError(f"❌ Error al generar resumen con Gemini: {e}")
+
+        return self._registrar_respuesta(key, text)
+
+    @classmethod
+    async def generate_many(cls, jobs: list[dict], force_refresh: bool = False) -> list[str]:
+        """
+        Varios resúmenes en paralelo (ej: uno por ZONA o por tramo de fechas).
+        Cada job son los kwargs de CREATE_RESUME; el tiempo total es el de la
+        llamada más lenta y no la suma. Devuelve los textos en el orden de 'jobs'.
+        """
+        resumidores = [cls(**job) for job in jobs]
+        return list(await asyncio.gather(*(r.agenerate_text(force_refresh) for r in resumidores)))
+
+    def _buscar_en_cache(self, key: str) -> str | None:
+        """Primero coincidencia exacta; si no, un resumen de actividades casi iguales."""
+        cached = self._leer_cache(key)
+        if cached is None:
+            cached = self._buscar_similar()
+        return cached
+
+    def _registrar_respuesta(self, key: str, text: str) -> str:
+        if not text:
+            return "No se pudo obtener texto desde Gemini (respuesta vacía)."
+        self._guardar_cache(key, text)
+        self._indexar(key)
+        return text
+
+    # ─────────────── Caché de respuestas ───────────────
+    def _cache_key(self) -> str:
+        """Hash del conjunto de actividades (sin importar el orden) + rango de fechas + modelo."""
+        payload = json.dumps(
+            [sorted(self.actividades_unicas), self.fecha_inicial, self.fecha_final, self.model_name],
+            ensure_ascii=False,
+        )
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _leer_cache(key: str) -> str | None:
+        if key in _RESUMENES:
+            return _RESUMENES[key]
+        path = _CACHE_DIR / f"{key}.txt"
+        if path.exists():
+            _RESUMENES[key] = text = path.read_text(encoding="utf-8")
+            return text
+        return None
+
+    @staticmethod
+    def _guardar_cache(key: str, text: str) -> None:
+        _RESUMENES[key] = text
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        (_CACHE_DIR / f"{key}.txt").write_text(text, encoding="utf-8")
+
+    # ─────────────── Caché por similitud ───────────────
+    def _actividades_norm(self) -> set[str]:
+        return {a.upper() for a in self.actividades_unicas}
+
+    def _buscar_similar(self) -> str | None:
+        """
+        Resumen ya generado (mismo modelo y mismo rango de fechas: el prompt las
+        menciona, así que el texto puede citarlas) cuyo conjunto de actividades se
+        parece al actual: similitud de Jaccard >= similarity_threshold. Cubre
+        re-ejecuciones con casi las mismas actividades (una o dos nuevas) sin llamar a Gemini.
+        Desactivado por defecto (similarity_threshold=None): el resumen reutilizado no
+        menciona las actividades nuevas; solo para borradores donde eso es aceptable.
+        """
+        if self.similarity_threshold is None:
+            return None
+        actual = self._actividades_norm()
+        fechas = [self.fecha_inicial, self.fecha_final]
+        mejor_key, mejor_sim = None, self.similarity_threshold
+        for reg in self._cargar_indice():
+            if reg["model"] != self.model_name or reg.get("fechas") != fechas:
+                continue
+            previas = set(reg["actividades"])
+            sim = len(actual & previas) / len(actual | previas)
+            if sim >= mejor_sim:
+                mejor_key, mejor_sim = reg["key"], sim
+        return self._leer_cache(mejor_key) if mejor_key else None
+
+    @staticmethod
+    def _cargar_indice() -> list[dict]:
+        global _INDICE
+        if _INDICE is None:
+            _INDICE = []
+            if _INDICE_PATH.exists():
+                with open(_INDICE_PATH, encoding="utf-8") as f:
+                    _INDICE = [json.loads(line) for line in f if line.strip()]
+        return _INDICE
+
+    def _indexar(self, key: str) -> None:
+        reg = {
+            "key": key,
+            "model": self.model_name,
+            "fechas": [self.fecha_inicial, self.fecha_final],
+            "actividades": sorted(self._actividades_norm()),
+        }
+        self._cargar_indice().append(reg)
+        with open(_INDICE_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(reg, ensure_ascii=False) + "\n")
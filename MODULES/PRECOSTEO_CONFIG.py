@@ -0,0 +1,84 @@
+"""
+Configuración de los precosteos, sin dependencias pesadas.
+
+Se puede importar sin cargar fpdf ni pandas (ej: para armar PrecosteoSpec o leer
+PDFLayoutConfig); CREATE_PRECOSTEO_PDF re-exporta estos nombres.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass(frozen=True, slots=True)
+class PDFLayoutConfig:
+    # Página
+    orientation: str = "P"
+    unit: str = "mm"
+    format: str = "Letter"
+
+    # Márgenes (mm)
+    top_margin: float = 24.0
+    left_margin: float = 15.0
+    right_margin: float = 15.0
+
+    # Espacios visuales (mm)
+    header_lift_after: float = 12.0
+
+    # Plantillas
+    templates_dirname: str = "TEMPLATES"
+    header_filename: str = "header.png"
+    footer_filename: str = "footer.png"
+    template_dpi: int = 150       # resolución de las copias reducidas (JPEG) de header/footer/firma
+    template_jpeg_quality: int = 85
+    image_filter: str = "DCTDecode"  # JPEG para todas las imágenes (plantillas ya son JPEG)
+
+    signature_filename: str = "firma.png"
+    signature_width_ratio: float = 0.60   # ajusta (0.55–0.70 suele quedar bien)
+    signature_gap_before: float = 10.0     # espacio (mm) después de la tabla
+
+    # Salida
+    output_dirname: str = "BD/PRECOSTEOS"
+    output_prefix: str = "PRECOSTEO"
+
+    # Tipografía por defecto
+    default_font_family: str = "Helvetica"
+    default_font_size: int = 12
+    default_line_height: float = 6.0
+
+    # Footer (ajuste fino visual)
+    footer_height: float = 12.0
+    footer_width_ratio: float = 0.50
+    footer_bottom_margin: float = 7.0
+    footer_margin: float = 28.0  # margen de seguridad para el contenido
+
+    def __post_init__(self):
+        for name in ("top_margin", "left_margin", "right_margin", "footer_height",
+                     "footer_bottom_margin", "footer_margin", "signature_gap_before"):
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} no puede ser negativo: {getattr(self, name)}")
+        for name in ("footer_width_ratio", "signature_width_ratio"):
+            if not 0 < getattr(self, name) <= 1:
+                raise ValueError(f"{name} debe estar en (0, 1]: {getattr(self, name)}")
+        if self.template_dpi <= 0:
+            raise ValueError(f"template_dpi debe ser positivo: {self.template_dpi}")
+
+
+# Config por defecto compartida (inmutable): evita construir una por instancia
+_DEFAULT_CONFIG = PDFLayoutConfig()
+
+
+@dataclass(frozen=True)
+class PrecosteoSpec:
+    """Parámetros de un precosteo para CreatePrecostoPDF.render_batch()."""
+    codigo_precosteo: str
+    resumen: str
+    df_lugares: pd.DataFrame
+    fecha_inicio: str
+    fecha_fin: str
+    bd: pd.DataFrame
+    path: Path | None = None  # None -> default_output_path(codigo_precosteo)
@@ -0,0 +1,107 @@
+"""
+Punto de entrada único para generar un precosteo.
+
+Uso (desde la raíz del proyecto):
+    python scripts/run_precosteo.py --codigo PRECOSTEO-X --desde 11/26/2025 --hasta 12/10/2025 --resumir
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Permite ejecutarlo como script (python scripts/run_precosteo.py) además de con -m
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+# Los módulos pesados (pandas, fpdf, google-genai) se importan dentro de main(),
+# después de leer los argumentos: --help responde sin cargarlos.
+
+RESUMEN_POR_DEFECTO = (
+    "Las actividades ejecutadas se orientaron al mantenimiento integral de cubiertas "
+    "y sistemas hidrosanitarios, incluyendo revisiones técnicas y labores necesarias "
+    "para garantizar su correcto funcionamiento.\n\n"
+    "Se realizaron trabajos de mantenimiento preventivo y correctivo en cubiertas por "
+    "filtraciones de aguas lluvias, abarcando la limpieza de canales y la ejecución de "
+    "labores en altura con los equipos de seguridad requeridos.\n\n"
+    "Adicionalmente, se llevaron a cabo revisiones hidrosanitarias, destapes sencillos "
+    "y especializados de aparatos sanitarios, instalación y reparación de accesorios y "
+    "aparatos sanitarios, así como reparaciones puntuales en tuberías, tanques y equipos "
+    "como motobombas, asegurando la continuidad, higiene y adecuada operación de las "
+    "instalaciones intervenidas."
+)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Genera el PDF de un precosteo a partir del BD en Excel.")
+    parser.add_argument("--codigo", default="PRECOSTEO-AMC-0030-25-SPRBUN", help="Código del precosteo")
+    parser.add_argument("--desde", default="11/26/2025", help="Fecha inicial (MM/DD/YYYY)")
+    parser.add_argument("--hasta", default="12/10/2025", help="Fecha final (MM/DD/YYYY)")
+    parser.add_argument(
+        "--excel",
+        default=str(_ROOT / "BD" / "EXCEL" / "BD_ACTIVIDADES_HIDROSANITARIAS_CUBIERTAS.xlsx"),
+        help="Ruta del Excel del BD",
+    )
+    parser.add_argument("--hoja", default="BD", help="Hoja del Excel con el BD")
+    parser.add_argument(
+        "--resumir",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Generar el resumen con Gemini en vez de usar el texto por defecto",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    from MODULES.BD_LOADER import build_df_lugares, load_bd
+    from MODULES.CREATE_PRECOSTEO_PDF import CreatePrecostoPDF
+
+    load_dotenv()
+    codigo = args.codigo
+
+    # Rango fechas
+    fecha_inicio = args.desde
+    fecha_fin = args.hasta
+
+    # BD desde Excel
+    bd = load_bd(args.excel, sheet=args.hoja)  # espejo .pkl junto al Excel (se regenera si el Excel cambia)
+    # Fechas parseadas una sola vez (las reutilizan el filtro del PDF y CREATE_RESUME)
+    bd = CreatePrecostoPDF.prepare_bd(bd)
+
+    resumen = RESUMEN_POR_DEFECTO
+    if args.resumir:
+        import asyncio
+
+        from MODULES.CREATE_RESUME import CREATE_RESUME
+
+        # Uno o varios resúmenes (ej: uno por ZONA); las llamadas a Gemini van en paralelo
+        [resumen] = asyncio.run(CREATE_RESUME.generate_many([
+            dict(
+                bd=bd,
+                fecha_inicial=fecha_inicio,  # MM/DD/YYYY
+                fecha_final=fecha_fin     # MM/DD/YYYY
+            ),
+        ]))
+        print(resumen)
+
+    # df_lugares a partir de ZONA (solo valores únicos y válidos)
+    df_lugares = build_df_lugares(bd, "ZONA")
+
+    pdf = CreatePrecostoPDF()
+    pdf.render_precosteo(
+        codigo_precosteo=codigo,
+        resumen=resumen,
+        df_lugares=df_lugares,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        bd=bd,
+    )
+
+    out = pdf.save(cod_prec=codigo)
+    print(f"✅ PDF generado: {out}")
+
+if __name__ == "__main__":
+    main()